@@ -7,6 +7,9 @@ import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
 import json
 import os
+import socket
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
 
 # Mapping of sensor IDs (0x01 to 0x19) to their parameters and types
 ID_MAP_INT = {
@@ -48,15 +51,113 @@ ID_MAP_INT = {
 
 CONFIG_FILE = "ecowitt_config.json"
 
-def get_live_data(gateway_ip):
+# Gateway discovery settings
+DISCOVERY_PORT = 46000  # UDP port Ecowitt gateways listen on for discovery broadcasts
+DISCOVERY_TIMEOUT = 1.0  # Seconds to wait for broadcast replies
+PROBE_CONNECT_TIMEOUT = 0.5  # Seconds to wait for each host to accept a connection when probing the subnet
+GATEWAY_READ_TIMEOUT = 5  # Seconds to wait for a gateway to send its live data, they can be slow to answer HTTP
+PROBE_WORKERS = 128  # Number of hosts probed at the same time
+# CMD_BROADCAST packet: header (0xFF 0xFF), command (0x12), size (0x03), checksum (0x15)
+CMD_BROADCAST = bytes([0xFF, 0xFF, 0x12, 0x03, 0x15])
+
+def get_live_data(gateway_ip, timeout=GATEWAY_READ_TIMEOUT):
     url = f'http://{gateway_ip}/get_livedata_info'
     try:
-        response = requests.get(url, timeout=5)
+        response = requests.get(url, timeout=timeout)
         response.raise_for_status()
         data = response.json()
         return data
     except requests.RequestException as e:
         return {'error': str(e)}
+    except ValueError as e:
+        # Something answered on port 80, but not with JSON
+        return {'error': str(e)}
+
+def is_gateway_data(data):
+    """Check whether a /get_livedata_info response looks like it came from an Ecowitt gateway."""
+    if not isinstance(data, dict) or 'error' in data:
+        return False
+    return any(key in data for key in ('common_list', 'wh25', 'ch_soil'))
+
+def parse_discovery_response(packet):
+    """Parse a CMD_BROADCAST reply into a dict with the gateway's MAC, IP and SSID."""
+    # Layout: FF FF 12 | size (2) | MAC (6) | IP (4) | port (2) | SSID length (1) | SSID | checksum
+    if len(packet) < 19 or packet[0:3] != CMD_BROADCAST[0:3]:
+        return None
+    if sum(packet[2:-1]) & 0xFF != packet[-1]:
+        return None
+    mac = ':'.join(f"{b:02X}" for b in packet[5:11])
+    ip = '.'.join(str(b) for b in packet[11:15])
+    ssid = packet[18:18 + packet[17]].decode('utf-8', errors='replace')
+    return {'ip': ip, 'mac': mac, 'ssid': ssid}
+
+def broadcast_discovery(broadcast_addr='255.255.255.255', port=DISCOVERY_PORT, timeout=DISCOVERY_TIMEOUT):
+    """Broadcast the Ecowitt discovery command and collect every gateway that replies."""
+    found = {}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.sendto(CMD_BROADCAST, (broadcast_addr, port))
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            sock.settimeout(remaining)
+            try:
+                packet, _ = sock.recvfrom(1024)
+            except socket.timeout:
+                break
+            gateway = parse_discovery_response(packet)
+            if gateway:
+                found[gateway['ip']] = gateway
+    except OSError:
+        pass  # No usable network (or broadcasts blocked), fall back to probing
+    finally:
+        sock.close()
+    return list(found.values())
+
+def local_subnet_hosts():
+    """Return every other host address in the /24 this computer is on."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        # Connecting a UDP socket sends nothing, it just picks the outgoing interface
+        sock.connect(('10.255.255.255', 1))
+        local_ip = sock.getsockname()[0]
+    except OSError:
+        return []
+    finally:
+        sock.close()
+    network = ipaddress.ip_network(f"{local_ip}/24", strict=False)
+    return [str(host) for host in network.hosts() if str(host) != local_ip]
+
+def probe_hosts(hosts, timeout=(PROBE_CONNECT_TIMEOUT, GATEWAY_READ_TIMEOUT), max_workers=PROBE_WORKERS):
+    """Fetch /get_livedata_info from many hosts at once and return the ones that are gateways."""
+    if not hosts:
+        return []
+    gateways = []
+    # The default (connect, read) timeout drops missing hosts quickly but gives real gateways time to answer
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(hosts))) as pool:
+        results = pool.map(lambda host: get_live_data(host, timeout=timeout), hosts)
+        for host, data in zip(hosts, results):
+            if is_gateway_data(data):
+                gateways.append({'ip': host, 'data': data})
+    return gateways
+
+def discover_gateways():
+    """Find Ecowitt gateways on the local network along with their current live data."""
+    # Step 1: Ask gateways to announce themselves
+    announced = {gateway['ip']: gateway for gateway in broadcast_discovery()}
+
+    # Step 2: Fetch live data from the announced gateways
+    gateways = probe_hosts(list(announced), timeout=GATEWAY_READ_TIMEOUT)
+
+    # Step 3: Sweep the whole subnet if no announced gateway returned live data
+    if not gateways:
+        gateways = probe_hosts(local_subnet_hosts())
+    for gateway in gateways:
+        gateway.update({k: v for k, v in announced.get(gateway['ip'], {}).items() if k != 'ip'})
+    return gateways
 
 def fahrenheit_to_celsius(f):
     return (f - 32) * 5.0 / 9.0
@@ -77,6 +178,7 @@ class EcowittApp:
         self.config = {}
         self.sensors = {}
         self.gateway_ip = ''
+        self.searching = False  # True while the setup wizard is looking for gateways
         self.soil_tree = None  # Initialize soil_tree to None
         self.theme = tk.StringVar(value="dark")  # Default theme is dark
 
@@ -134,18 +236,18 @@ class EcowittApp:
         self.root.config(menu=menu_bar)
 
         # Settings menu
-        settings_menu = tk.Menu(menu_bar, tearoff=0)
-        settings_menu.add_command(label="Setup Wizard", command=self.setup_wizard)
+        self.settings_menu = tk.Menu(menu_bar, tearoff=0)
+        self.settings_menu.add_command(label="Setup Wizard", command=self.setup_wizard)
 
         # Theme submenu
-        theme_menu = tk.Menu(settings_menu, tearoff=0)
+        theme_menu = tk.Menu(self.settings_menu, tearoff=0)
         theme_menu.add_radiobutton(label="Dark Mode", variable=self.theme, value="dark", command=self.apply_theme)
         theme_menu.add_radiobutton(label="Matrix Theme", variable=self.theme, value="matrix", command=self.apply_theme)
-        settings_menu.add_cascade(label="Theme", menu=theme_menu)
+        self.settings_menu.add_cascade(label="Theme", menu=theme_menu)
 
-        settings_menu.add_separator()
-        settings_menu.add_command(label="Exit", command=self.root.quit)
-        menu_bar.add_cascade(label="Settings", menu=settings_menu)
+        self.settings_menu.add_separator()
+        self.settings_menu.add_command(label="Exit", command=self.root.quit)
+        menu_bar.add_cascade(label="Settings", menu=self.settings_menu)
 
     def apply_theme(self):
         selected_theme = self.theme.get()
@@ -209,8 +311,88 @@ class EcowittApp:
             else:
                 self.update_widget_styles(child)  # Recursive call to catch all widgets
 
+    def set_wizard_enabled(self, enabled):
+        state = tk.NORMAL if enabled else tk.DISABLED
+        self.settings_button.config(state=state)
+        self.settings_menu.entryconfig("Setup Wizard", state=state)
+
     def setup_wizard(self):
-        # Step 1: Get Gateway IP
+        # Only one search at a time
+        if self.searching:
+            return
+        self.searching = True
+        self.set_wizard_enabled(False)
+
+        # Step 1: Search the network for gateways in the background so the window stays responsive
+        status_window = tk.Toplevel(self.root)
+        status_window.title("Searching")
+        status_window.transient(self.root)
+        ttk.Label(status_window, text="Searching the network for Ecowitt gateways...").pack(padx=20, pady=20)
+        self.update_widget_styles(status_window)
+        result = {}
+
+        def search():
+            result['gateways'] = discover_gateways()
+
+        worker = threading.Thread(target=search, daemon=True)
+        worker.start()
+
+        def wait_for_search():
+            if worker.is_alive():
+                self.root.after(100, wait_for_search)
+                return
+            status_window.destroy()
+            self.searching = False
+            self.set_wizard_enabled(True)
+            self.choose_gateway(result.get('gateways', []))
+
+        wait_for_search()
+
+    def choose_gateway(self, gateways):
+        # Fall back to asking for the IP if nothing was found
+        if not gateways:
+            self.enter_gateway_ip()
+            return
+
+        # Create a new window for choosing the gateway
+        choose_window = tk.Toplevel(self.root)
+        choose_window.title("Select Gateway")
+        choose_window.transient(self.root)
+        choose_window.grab_set()
+
+        ttk.Label(choose_window, text="Select your Ecowitt Gateway:").grid(row=0, column=0, columnspan=2, pady=10)
+
+        # Preselect the configured gateway if it was found, otherwise the first one
+        known_ips = [gateway['ip'] for gateway in gateways]
+        selected_ip = tk.StringVar(value=self.gateway_ip if self.gateway_ip in known_ips else known_ips[0])
+
+        for idx, gateway in enumerate(gateways):
+            reading_count = len(self.collect_sensor_readings(gateway['data']))
+            label_text = gateway['ip']
+            if gateway.get('mac'):
+                label_text += f" (MAC: {gateway['mac']})"
+            label_text += f" - {reading_count} readings"
+            ttk.Radiobutton(choose_window, text=label_text, variable=selected_ip, value=gateway['ip']).grid(row=idx+1, column=0, columnspan=2, padx=5, sticky=tk.W)
+
+        # Apply theme to widgets in the gateway window
+        self.update_widget_styles(choose_window)
+
+        def confirm_gateway():
+            gateway = gateways[known_ips.index(selected_ip.get())]
+            self.gateway_ip = gateway['ip']
+            choose_window.destroy()
+            # Step 2: Use the readings fetched during discovery
+            self.scan_sensors(gateway['data'])
+
+        def enter_manually():
+            choose_window.destroy()
+            self.enter_gateway_ip()
+
+        ttk.Button(choose_window, text="Next", command=confirm_gateway).grid(row=len(gateways)+1, column=0, pady=10)
+        ttk.Button(choose_window, text="Enter IP Manually", command=enter_manually).grid(row=len(gateways)+1, column=1, pady=10)
+
+    def enter_gateway_ip(self):
+        # Get Gateway IP
         self.gateway_ip = simpledialog.askstring("Gateway IP", "Enter your Ecowitt Gateway IP Address:", initialvalue=self.gateway_ip)
         if not self.gateway_ip:
             messagebox.showerror("Error", "Gateway IP is required.")
@@ -222,6 +404,9 @@ class EcowittApp:
             messagebox.showerror("Error", f"Error retrieving data: {data['error']}")
             return
 
+        self.scan_sensors(data)
+
+    def scan_sensors(self, data):
         # Collect all sensor readings
         sensor_readings = self.collect_sensor_readings(data)
 
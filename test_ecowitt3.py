@@ -0,0 +1,161 @@
+import json
+import socket
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import ecowitt3
+
+GATEWAY_DATA = {'common_list': [{'id': '0x02', 'val': '70.1', 'unit': 'F'}]}
+
+
+def build_discovery_response(mac, ip, port=45000, ssid=b'GW1100A-WIFI'):
+    body = bytes(mac) + bytes(ip) + port.to_bytes(2, 'big') + bytes([len(ssid)]) + ssid
+    # Size covers everything after the header, including the checksum
+    packet = bytes([0x12]) + (len(body) + 5).to_bytes(2, 'big') + body
+    return b'\xff\xff' + packet + bytes([sum(packet) & 0xFF])
+
+
+def start_http_stub(body, delay=0):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def gateway_stub():
+    server = start_http_stub(json.dumps(GATEWAY_DATA).encode())
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def slow_gateway_stub():
+    # Accepts the connection at once but takes longer than the connect timeout to send its data
+    server = start_http_stub(json.dumps(GATEWAY_DATA).encode(), delay=ecowitt3.PROBE_CONNECT_TIMEOUT + 0.5)
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def html_stub():
+    server = start_http_stub(b'<html>Not a gateway</html>')
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def closed_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"127.0.0.1:{port}"
+
+
+@pytest.fixture
+def silent_host():
+    # A listener whose accept queue is full drops new connection attempts,
+    # so probes wait out the connect timeout like they would for a missing host
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(0)
+    filler = socket.create_connection(listener.getsockname())
+    yield f"127.0.0.1:{listener.getsockname()[1]}"
+    filler.close()
+    listener.close()
+
+
+def test_parse_discovery_response():
+    packet = build_discovery_response([0xAB] * 6, [192, 168, 1, 50])
+    assert ecowitt3.parse_discovery_response(packet) == {
+        'ip': '192.168.1.50',
+        'mac': 'AB:AB:AB:AB:AB:AB',
+        'ssid': 'GW1100A-WIFI',
+    }
+
+
+def test_parse_discovery_response_bad_checksum():
+    packet = build_discovery_response([0xAB] * 6, [192, 168, 1, 50])
+    packet = packet[:-1] + bytes([(packet[-1] + 1) & 0xFF])
+    assert ecowitt3.parse_discovery_response(packet) is None
+
+
+def test_parse_discovery_response_too_short():
+    assert ecowitt3.parse_discovery_response(ecowitt3.CMD_BROADCAST) is None
+    assert ecowitt3.parse_discovery_response(b'') is None
+
+
+def test_broadcast_discovery():
+    responder = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    responder.bind(('127.0.0.1', 0))
+    responder.settimeout(2)
+
+    def respond():
+        packet, addr = responder.recvfrom(64)
+        if packet == ecowitt3.CMD_BROADCAST:
+            responder.sendto(build_discovery_response([0x01] * 6, [10, 0, 0, 7]), addr)
+
+    thread = threading.Thread(target=respond, daemon=True)
+    thread.start()
+    try:
+        gateways = ecowitt3.broadcast_discovery('127.0.0.1', responder.getsockname()[1], timeout=0.5)
+    finally:
+        thread.join()
+        responder.close()
+
+    assert gateways == [{'ip': '10.0.0.7', 'mac': '01:01:01:01:01:01', 'ssid': 'GW1100A-WIFI'}]
+
+
+def test_probe_hosts(gateway_stub, html_stub, closed_port):
+    gateways = ecowitt3.probe_hosts([html_stub, closed_port, gateway_stub])
+    assert gateways == [{'ip': gateway_stub, 'data': GATEWAY_DATA}]
+
+
+def test_probe_hosts_slow_gateway(slow_gateway_stub):
+    gateways = ecowitt3.probe_hosts([slow_gateway_stub])
+    assert gateways == [{'ip': slow_gateway_stub, 'data': GATEWAY_DATA}]
+
+
+def test_probe_hosts_full_subnet(gateway_stub, silent_host):
+    # 253 hosts that never answer plus one gateway, the size of a /24 sweep
+    hosts = [silent_host] * 253 + [gateway_stub]
+    start = time.monotonic()
+    gateways = ecowitt3.probe_hosts(hosts)
+    assert time.monotonic() - start < 2
+    assert gateways == [{'ip': gateway_stub, 'data': GATEWAY_DATA}]
+
+
+def test_probe_hosts_empty():
+    assert ecowitt3.probe_hosts([]) == []
+
+
+def test_discover_gateways_sweeps_when_announced_hosts_fail(monkeypatch, gateway_stub, closed_port):
+    # A device answered the broadcast but doesn't serve live data, so the subnet is swept instead
+    monkeypatch.setattr(ecowitt3, 'broadcast_discovery', lambda: [{'ip': closed_port, 'mac': '01:01:01:01:01:01', 'ssid': ''}])
+    monkeypatch.setattr(ecowitt3, 'local_subnet_hosts', lambda: [closed_port, gateway_stub])
+    assert ecowitt3.discover_gateways() == [{'ip': gateway_stub, 'data': GATEWAY_DATA}]
+
+
+def test_discover_gateways_slow_announced_gateway(monkeypatch, slow_gateway_stub):
+    # The announced gateway answers slower than the sweep's connect timeout but still within the read timeout
+    monkeypatch.setattr(ecowitt3, 'broadcast_discovery', lambda: [{'ip': slow_gateway_stub, 'mac': '01:01:01:01:01:01', 'ssid': 'GW1100A-WIFI'}])
+    monkeypatch.setattr(ecowitt3, 'local_subnet_hosts', lambda: [])
+    assert ecowitt3.discover_gateways() == [{
+        'ip': slow_gateway_stub,
+        'data': GATEWAY_DATA,
+        'mac': '01:01:01:01:01:01',
+        'ssid': 'GW1100A-WIFI',
+    }]